@@ -33,7 +33,9 @@ class StoreAnalysisAgent:
                 "- `metadata`: optional metadata\n\n"
 
                 "IMPORTANT RULES:\n"
-                "1. ALWAYS call the tool `store_analysis_result`.\n"
+                "1. ALWAYS call the tool `store_analysis_result`. If you have MORE THAN ONE result to save "
+                "in the same turn, call `store_analysis_results` ONCE with the full list instead of "
+                "calling the single-record tool repeatedly.\n"
                 "2. NEVER modify or rewrite the analysis JSON.\n"
                 "3. NEVER output markdown, explanations, or JSON by yourself.\n"
                 "4. After tool call, output a very short confirmation like:\n"
@@ -19,7 +19,8 @@ class DocumentProcessorAgent:
                 "2. Use your tools to:\n"
                 "   - Load and extract full text from the document efficiently.\n"
                 "   - Chunk text for efficient vector DB storage.\n"
-                "   - Store chunks in the vector DB using batch embeddings.\n"
+                "   - Store chunks in the vector DB using `store_chunks_batch(texts=[...], batch_size=128)` so all chunks\n"
+                "     in a batch are embedded in a single call — NEVER store chunks one at a time.\n"
                 "3. After ingestion, return a structured JSON:\n"
                 "   {\n"
                 "     \"file_name\": <original file name>,\n"
@@ -1,9 +1,103 @@
+import asyncio
+import functools
+import json
 import os
-from typing import List, Optional, Dict, Any
+import re
+import weakref
+from collections import OrderedDict, deque
+
+import httpx
+from typing import AsyncIterator, List, Optional, Dict, Any
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from tools.analysis_storage_tool import AnalysisStorageTool
 from tools.document_processor_tool import DocumentProcessorTools
+from utils.async_utils import run_sync
+
+
+# Shared, process-wide clients. Each ChatOpenAI holds its own HTTP session and
+# each tool wrapper re-opens the vector DB, so constructing them per QAAgent
+# (e.g., one per user session) duplicates connections and memory for nothing.
+# One keep-alive connection pool is shared by every LLM instance, so new
+# agents skip the TLS handshake on their first call.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64)
+_SHARED_SYNC_CLIENT = httpx.Client(limits=_HTTP_LIMITS)
+_SHARED_ASYNC_CLIENT = httpx.AsyncClient(limits=_HTTP_LIMITS)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_llm(model: str, temperature: float) -> ChatOpenAI:
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=_SHARED_SYNC_CLIENT,
+        http_async_client=_SHARED_ASYNC_CLIENT,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_doc_tools(persist_directory: str) -> DocumentProcessorTools:
+    return DocumentProcessorTools(persist_directory)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_analysis_tool(persist_directory: str) -> AnalysisStorageTool:
+    return AnalysisStorageTool(persist_directory)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_analysis_retrieve(persist_directory: str, question: str, doc_id: Optional[str], k: int):
+    """
+    Memoized analysis-store lookup. Study sessions repeat the same questions
+    often; a hit skips the embedding call and the vector query entirely.
+    Results are frozen to (content, metadata_items) tuples so they are
+    hashable/cacheable.
+    """
+    tool = _get_analysis_tool(persist_directory).get_retrieval_tools()[0]
+    result = tool.run({
+        "query": question,
+        "k": k,
+        "filter": {"doc_id": doc_id} if doc_id else None
+    })
+    return tuple(
+        (r["content"], tuple(sorted((r["metadata"] or {}).items(), key=lambda kv: kv[0])))
+        for r in result.get("results", [])
+    )
+
+
+# Live QAAgent instances, tracked so ingestion can invalidate their
+# per-instance question caches without keeping the agents alive.
+_INSTANCES: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def invalidate_retriever_cache() -> None:
+    """Drops memoized retrievals; call after new documents are ingested."""
+    _cached_analysis_retrieve.cache_clear()
+    for agent in _INSTANCES:
+        agent._qcache.clear()
+
+
+# Collapses whitespace/punctuation so light rephrasings hit the same cache slot.
+_QNORM_RE = re.compile(r"\W+")
+_QCACHE_SIZE = 64
+
+# Questions that are answered verbatim by a field of the stored analysis JSON
+# (SummarizerAgent / PYQSyllabusAnalyserAgent output) — no LLM call needed.
+_DIRECT_FIELD_PATTERNS = [
+    (re.compile(r"key takeaways?", re.IGNORECASE), "key_takeaways"),
+    (re.compile(r"important topics", re.IGNORECASE), "important_topics"),
+    (re.compile(r"summary overview", re.IGNORECASE), "summary_overview"),
+]
+
+
+class _RetrievedDoc:
+    """Lightweight Document stand-in for analysis results returned by the retrieval tool."""
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content: str, metadata: dict):
+        self.page_content = page_content
+        self.metadata = metadata
 
 
 class QAAgent:
@@ -22,28 +116,57 @@ class QAAgent:
         k: int = 6,
         temperature: float = 0.3,
         max_history: int = 6,
+        analysis_skip_threshold: float = 0.25,
     ):
         self.model_name = model
+        self.persist_directory = persist_directory
         self.doc_id = doc_id
         self.k = k
         self.temperature = temperature
         self.max_history = max_history
+        # Cosine-distance cutoff: when the top raw hits are at least this
+        # close, the analysis-store query is skipped entirely.
+        self.analysis_skip_threshold = analysis_skip_threshold
 
-        self.llm = ChatOpenAI(model=model, temperature=temperature)
+        self.llm = _get_llm(model, temperature)
 
-        self.dp = DocumentProcessorTools(persist_directory)
+        self.dp = _get_doc_tools(persist_directory)
         self.raw_vector_db = self.dp.get_vectordb()
         self.raw_retriever = self.raw_vector_db.as_retriever(search_kwargs={"k": k})
 
-        self.analysis_tool = AnalysisStorageTool(persist_directory)
+        self.analysis_tool = _get_analysis_tool(persist_directory)
         self.retrieve_tool = self.analysis_tool.get_retrieval_tools()[0]
 
-        self.history: List[Any] = []
+        # deque(maxlen=...) gives O(1) appends with automatic eviction, so
+        # long chats never grow the history or need manual truncation.
+        self.history: deque = deque(maxlen=max_history * 2)
+
+        # LRU of normalized question -> scored raw docs; a hit skips both the
+        # question embedding and the ANN search for that turn. Cleared by
+        # invalidate_retriever_cache() whenever new content is ingested.
+        self._qcache: "OrderedDict[str, list]" = OrderedDict()
+        _INSTANCES.add(self)
 
         self._doc_id_candidates = self._normalize_doc_ids(doc_id)
+        # One compiled alternation scans each metadata value in a single pass
+        # instead of looping every candidate substring in Python.
+        self._doc_id_re = (
+            re.compile("|".join(re.escape(c) for c in self._doc_id_candidates))
+            if self._doc_id_candidates else None
+        )
 
-    @property
-    def _system_prompt(self) -> str:
+        # The system prompt never changes for an agent instance, so build the
+        # SystemMessage once instead of re-validating it on every turn.
+        self._system_msg = SystemMessage(content=self._build_system_prompt())
+        # Likewise compile the full chat prompt once; format_messages only
+        # fills in history/context/question per turn.
+        self._prompt = ChatPromptTemplate.from_messages([
+            self._system_msg,
+            MessagesPlaceholder(variable_name="history"),
+            ("human", "CONTEXT:\n{context}\n\nQUESTION: {question}"),
+        ])
+
+    def _build_system_prompt(self) -> str:
         return (
             "You are ExamPrepAI, a knowledgeable assistant for students.\n"
             "You answer using ONLY the provided 'RAW TEXT CONTEXT' and 'ANALYSIS CONTEXT'.\n\n"
@@ -64,18 +187,23 @@ class QAAgent:
             return f"-- {label}: No context found --\n"
 
         out = [f"==== {label} ({len(docs)} docs) ===="]
+        out_append = out.append
         for i, d in enumerate(docs):
-            src = d.metadata.get("source") or d.metadata.get("file_name") or "unknown"
-            out.append(
-                f"[{label}-{i+1}] Source: {src}\n{d.page_content}\n"
-            )
+            meta = d.metadata
+            src = meta.get("source") or meta.get("file_name") or "unknown"
+            page = meta.get("page")
+            header = f"[{label}-{i+1}] Source: {src}"
+            if page is not None:
+                header += f" | Page: {page}"
+            out_append(header + "\n" + (d.page_content or "") + "\n")
         return "\n".join(out)
 
     def _messages(self, question: str, context: str) -> List[Any]:
-        msgs: List[Any] = [SystemMessage(content=self._system_prompt)]
-        msgs.extend(self.history[-self.max_history:])  # only last few messages
-        msgs.append(HumanMessage(content=f"CONTEXT:\n{context}\n\nQUESTION: {question}"))
-        return msgs
+        return self._prompt.format_messages(
+            history=list(self.history)[-self.max_history:],  # only last few messages
+            context=context,
+            question=question,
+        )
 
     def _normalize_doc_ids(self, raw_id: Optional[str]) -> set:
         if not raw_id:
@@ -85,63 +213,146 @@ class QAAgent:
 
     def _doc_matches(self, metadata: dict) -> bool:
         """Filter by doc_id."""
-        if not self.doc_id or not self._doc_id_candidates:
+        if not self.doc_id or self._doc_id_re is None:
             return True
         for key in ("doc_id", "source", "file_name", "source_filename"):
             val = metadata.get(key)
-            if val and any(c in str(val) for c in self._doc_id_candidates):
+            if val and self._doc_id_re.search(str(val)):
                 return True
         return False
 
-    def answer(self, question: str) -> str:
-
-        try:
-            raw_docs = self.raw_retriever.get_relevant_documents(question)
-        except Exception:
-            raw_docs = []
+    async def _aretrieve(self, question: str):
+        """Fetches raw then (conditionally) analysis context; returns (raw_docs, analysis_docs)."""
+        q_norm = _QNORM_RE.sub(" ", question.strip().lower())
+        cached = self._qcache.get(q_norm)
+        if cached is not None:
+            self._qcache.move_to_end(q_norm)
+            scored = cached
+        else:
+            try:
+                # Goes through the document tool so the optional in-RAM
+                # hnswlib mirror (HNSW_MIRROR=1) serves the hot read path;
+                # without the mirror this is a plain Chroma scored search.
+                scored = await asyncio.to_thread(self.dp.query_with_scores, question, self.k)
+            except Exception:
+                scored = []
+            else:
+                self._qcache[q_norm] = scored
+                if len(self._qcache) > _QCACHE_SIZE:
+                    self._qcache.popitem(last=False)
 
         if self.doc_id:
-            raw_docs = [d for d in raw_docs if self._doc_matches(d.metadata)]
+            scored = [(d, s) for d, s in scored if self._doc_matches(d.metadata)]
 
-        try:
-            tool_result = self.retrieve_tool.run(
-                {
-                    "query": question,
-                    "k": self.k,
-                    "filter": {"doc_id": self.doc_id} if self.doc_id else None
-                }
-            )
-
-            analysis_docs = []
-            for r in tool_result.get("results", []):
-                analysis_docs.append(
-                    type("Doc", (), {
-                        "page_content": r["content"],
-                        "metadata": r["metadata"]
-                    })
+        raw_docs = [d for d, _ in scored]
+        scores = [s for _, s in scored]
+
+        # When the raw store already returns very close matches (small cosine
+        # distance), the analysis query rarely adds anything — skip it. The
+        # check runs BEFORE the lookup is dispatched: a to_thread task can't
+        # actually be cancelled once its thread is running, so starting it
+        # eagerly would pay the embedding call and vector query regardless.
+        analysis_docs = []
+        if not (scores and min(scores[:3]) < self.analysis_skip_threshold):
+            try:
+                hits = await asyncio.to_thread(
+                    _cached_analysis_retrieve,
+                    self.persist_directory, question, self.doc_id, self.k
                 )
-        except Exception:
-            analysis_docs = []
+                analysis_docs = [_RetrievedDoc(content, dict(meta)) for content, meta in hits]
+            except Exception:
+                analysis_docs = []
 
-        combined_docs = raw_docs + analysis_docs
+        return raw_docs, analysis_docs
 
-        if not combined_docs:
-            ai = self.llm.invoke([
-                SystemMessage(content=self._system_prompt),
+    def _build_messages(self, question: str, raw_docs: List[Any], analysis_docs: List[Any]) -> List[Any]:
+        if not raw_docs and not analysis_docs:
+            return [
+                self._system_msg,
                 HumanMessage(content=f"No relevant context found.\nQUESTION: {question}")
-            ])
-            return ai.content
-
+            ]
         context = (
             self._format_context(raw_docs, "RAW TEXT") +
             "\n\n" +
             self._format_context(analysis_docs, "STORED ANALYSIS")
         )
+        return self._messages(question, context)
 
-        msgs = self._messages(question, context)
-        ai = self.llm.invoke(msgs)
+    def _try_direct_answer(self, question: str) -> Optional[str]:
+        """
+        Returns the matching stored-analysis field verbatim for trivial
+        questions like "what are the key takeaways", skipping the LLM call.
+        """
+        field = next(
+            (f for pattern, f in _DIRECT_FIELD_PATTERNS if pattern.search(question)),
+            None
+        )
+        if field is None:
+            return None
 
-        self.history.append(HumanMessage(content=question))
-        self.history.append(AIMessage(content=ai.content))
+        try:
+            hits = _cached_analysis_retrieve(self.persist_directory, question, self.doc_id, self.k)
+        except Exception:
+            return None
+
+        for content, _meta in hits:
+            try:
+                data = json.loads(content)
+            except (ValueError, TypeError):
+                continue
+            value = data.get(field) if isinstance(data, dict) else None
+            if value:
+                if isinstance(value, list):
+                    return "\n".join(f"- {item}" for item in value)
+                return str(value)
+        return None
+
+    async def aanswer(self, question: str) -> str:
+        direct = await asyncio.to_thread(self._try_direct_answer, question)
+        if direct is not None:
+            return direct
+
+        raw_docs, analysis_docs = await self._aretrieve(question)
+        msgs = self._build_messages(question, raw_docs, analysis_docs)
+        ai = await self.llm.ainvoke(msgs)
+
+        if raw_docs or analysis_docs:
+            self.history.append(HumanMessage(content=question))
+            self.history.append(AIMessage(content=ai.content))
 
         return ai.content
+
+    async def astream_answer(self, question: str) -> AsyncIterator[str]:
+        """
+        Streams answer tokens as they arrive instead of blocking until the
+        full completion is ready; history is updated once the stream ends.
+        """
+        direct = await asyncio.to_thread(self._try_direct_answer, question)
+        if direct is not None:
+            yield direct
+            return
+
+        raw_docs, analysis_docs = await self._aretrieve(question)
+        msgs = self._build_messages(question, raw_docs, analysis_docs)
+
+        parts: List[str] = []
+        async for chunk in self.llm.astream(msgs):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+
+        if raw_docs or analysis_docs:
+            self.history.append(HumanMessage(content=question))
+            self.history.append(AIMessage(content="".join(parts)))
+
+    def answer(self, question: str) -> str:
+        """Sync wrapper around `aanswer` for callers outside an event loop."""
+        return run_sync(self.aanswer(question))
+
+    async def aanswer_batch(self, questions: List[str]) -> List[str]:
+        """Answers several questions concurrently; retrievals and LLM calls overlap."""
+        return list(await asyncio.gather(*(self.aanswer(q) for q in questions)))
+
+    def answer_batch(self, questions: List[str]) -> List[str]:
+        """Sync wrapper around `aanswer_batch`."""
+        return run_sync(self.aanswer_batch(questions))
@@ -27,7 +27,7 @@ class SupervisorAgent:
                 "- **document_ingestion_agent** → Extracts text from uploaded documents (PDF, DOCX, images) and stores them in the vector database.\n"
                 "- **summarizer_agent** → Explains or describes uploaded notes, study material, or books in a detailed, topic-wise manner.\n"
                 "- **pyq_syllabus_analysis_agent** → Analyzes syllabus and PYQs to detect repeated topics, important areas, and predict future questions.\n"
-                "- **youtube_summarizer_agent** → Extracts transcript from YouTube videos and generates a structured explanation with key insights.\n"
+                "- **youtube_video_summarizer_agent** → Extracts transcript from YouTube videos and generates a structured explanation with key insights.\n"
                 "- **store_analysis_agent** → Stores the analysis results from other agents into the vector database for future retrieval.\n"
                 "- **end** → Marks the completion of the workflow.\n\n"
 
@@ -38,7 +38,7 @@ class SupervisorAgent:
                 "   - If the document type is **notes, book, or study material**, then call **summarizer_agent**.\n"
                 "   - If the document type is **PYQs or syllabus**, then call **pyq_syllabus_analysis_agent**.\n\n"
                 "3 **When the user provides a YouTube video link:**\n"
-                "   → Directly call **youtube_summarizer_agent**.\n\n"
+                "   → Directly call **youtube_video_summarizer_agent**.\n\n"
                 "4 **When an agent returns JSON analysis (summary, PYQ trends, syllabus analysis, video summary):**\n"
                 "    → Route to **store_analysis_agent** to save the analysis into the vector database.\n\n"
                 "5 **When storing is complete:**\n"
@@ -48,18 +48,23 @@ class SupervisorAgent:
                 "- File extensions (.pdf, .docx, .jpg, .png) → Document ingestion first.\n"
                 "- Words like 'notes', 'material', or 'book' → summarizer_agent.\n"
                 "- Words like 'syllabus', 'PYQ', 'previous year', 'exam paper' → pyq_syllabus_analysis_agent.\n"
-                "- YouTube or video link (youtube.com / youtu.be) → youtube_summarizer_agent.\n\n"
+                "- YouTube or video link (youtube.com / youtu.be) → youtube_video_summarizer_agent.\n\n"
 
                 "### RESPONSE FORMAT\n"
                 "Return **STRICT JSON ONLY**, no markdown or explanations:\n"
                 "{\n"
-                "  \"next_agent\": \"<one_of: document_ingestion_agent | summarizer_agent | pyq_syllabus_analysis_agent | youtube_summarizer_agent | end>\",\n"
-                "  \"reason\": \"<short explanation of why you chose this agent>\"\n"
+                "  \"next_agents\": [\"<one_or_more_of: document_ingestion_agent | summarizer_agent | pyq_syllabus_analysis_agent | youtube_video_summarizer_agent | store_analysis_agent | end>\"],\n"
+                "  \"reason\": \"<short explanation of why you chose these agents>\"\n"
                 "}\n\n"
 
+                "List MORE THAN ONE agent only when the steps are truly independent — e.g. after ingesting "
+                "both notes AND a syllabus/PYQ document, return "
+                "[\"summarizer_agent\", \"pyq_syllabus_analysis_agent\"] so they run in parallel. "
+                "Dependent steps must still be routed one at a time.\n\n"
+
                 "If you are unsure or no valid next step exists, choose:\n"
                 "{\n"
-                "  \"next_agent\": \"end\",\n"
+                "  \"next_agents\": [\"end\"],\n"
                 "  \"reason\": \"unclear or completed state\"\n"
                 "}\n\n"
 
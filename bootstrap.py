@@ -0,0 +1,35 @@
+# bootstrap.py
+"""Single place that builds the agent registry and compiled graph.
+
+Every entrypoint should call build_agents() instead of instantiating
+agents itself: the lru_cache guarantees one agent set and one compiled
+graph per persist directory per process, so re-imports (uvicorn reload,
+multiple entrypoints) don't double import-time cost or open competing
+Chroma handles against the same SQLite file.
+"""
+from functools import lru_cache
+
+from graph.multi_agent_graph import MultiAgentGraph
+from agents.supervisor_agent import SupervisorAgent
+from agents.document_processor_agent import DocumentProcessorAgent
+from agents.summarizer_agent import SummarizerAgent
+from agents.pyq_syllabus_analyser_agent import PYQSyllabusAnalyserAgent
+from agents.youtube_summarizer_agent import YouTubeSummarizerAgent
+from agents.StoreAnalysisAgent import StoreAnalysisAgent
+
+
+@lru_cache(maxsize=None)
+def build_agents(persist_directory: str = "vector_store"):
+    """Returns (agents dict, compiled graph) for the given persist directory."""
+    agents = {
+        "supervisor_agent": SupervisorAgent().create_agent(),
+        "document_ingestion_agent": DocumentProcessorAgent(persist_directory=persist_directory).create_agent(),
+        "summarizer_agent": SummarizerAgent(persist_directory=persist_directory).create_agent(),
+        "pyq_syllabus_analysis_agent": PYQSyllabusAnalyserAgent(persist_directory=persist_directory).create_agent(),
+        "youtube_video_summarizer_agent": YouTubeSummarizerAgent(persist_directory=persist_directory).create_agent(),
+        "store_analysis_agent": StoreAnalysisAgent(persist_directory=persist_directory).create_agent(),
+    }
+
+    agent_graph = MultiAgentGraph(agents)
+    agent_graph.build_graph()
+    return agents, agent_graph.compile()
@@ -1,12 +1,85 @@
 # graph/multi_agent_graph.py
+import logging
+import re
+from functools import lru_cache
+from typing import List, Optional
 from langgraph.graph import StateGraph, START, END, MessagesState
 from langchain_core.messages import AIMessage
-import json
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _repair_json(content: str) -> Optional[str]:
+    """
+    Deterministic salvage for the usual LLM JSON slip-ups — markdown fences,
+    a chatty preamble around the object, trailing commas. Much cheaper than
+    re-running the supervisor, and O(n) in the message length.
+    """
+    fenced = _FENCE_RE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    return _TRAILING_COMMA_RE.sub(r"\1", content[start:end + 1])
+
+
+class SupervisorDecision(BaseModel):
+    """Schema for the supervisor's routing JSON; parsed in one C-level call.
+
+    Targets are plain strings on purpose: decide_next filters them against
+    the registered routes per element, so one hallucinated agent name
+    degrades to a skipped target instead of invalidating the whole decision.
+    """
+    next_agents: List[str] = []
+    next_agent: Optional[str] = None  # legacy single-agent format
+    reason: str = "No reason provided."
+
+    def targets(self) -> List[str]:
+        if self.next_agents:
+            return list(self.next_agents)
+        return [self.next_agent] if self.next_agent else []
+
+
+@lru_cache(maxsize=256)
+def _parse_decision(content: str):
+    """
+    Parses (and if needed repairs) a supervisor reply into (targets, reason).
+    LangGraph revisits the supervisor with identical tails often enough that
+    memoizing on the raw content makes repeat traversals a dict lookup.
+    Returns (None, None) when the content cannot be salvaged.
+    """
+    try:
+        decision = SupervisorDecision.model_validate_json(content)
+    except ValidationError:
+        repaired = _repair_json(content)
+        if not repaired:
+            return None, None
+        try:
+            decision = SupervisorDecision.model_validate_json(repaired)
+        except ValidationError:
+            return None, None
+    return tuple(decision.targets()), decision.reason
 
 class MultiAgentGraph:
     def __init__(self, agents: dict):
         self.agents = agents
         self.graph = StateGraph(MessagesState)
+        # Routing table derived from the registered agents once, instead of a
+        # hand-maintained dict literal rebuilt on every build_graph call.
+        self._route_map = {
+            name: name for name in agents if name != "supervisor_agent"
+        }
+        self._route_map["end"] = END
+        # Frozen set of legal routes: validating a parsed target is one hashed
+        # membership test, and typos degrade to "end" instead of a graph error.
+        self._valid = frozenset(self._route_map)
 
     def build_graph(self):
         for name, agent in self.agents.items():
@@ -21,39 +94,37 @@ class MultiAgentGraph:
         self.graph.add_conditional_edges(
             "supervisor_agent",
             self.decide_next,
-            {
-                "document_ingestion_agent": "document_ingestion_agent",
-                "summarizer_agent": "summarizer_agent",
-                "pyq_syllabus_analysis_agent": "pyq_syllabus_analysis_agent",
-                "youtube_video_summarizer_agent": "youtube_video_summarizer_agent",
-                "store_analysis_agent": "store_analysis_agent",
-                "end": END,
-            }
+            self._route_map
         )
 
-    def decide_next(self, state: MessagesState) -> str:
+    def decide_next(self, state: MessagesState):
         """
         Reads Supervisor's last AI message (must be strict JSON):
         {
-          "next_agent": "<agent_name or END>",
+          "next_agents": ["<agent_name or END>", ...],
           "reason": "<reason>"
         }
+
+        Returns a single route, or a list of routes — LangGraph runs listed
+        branches in parallel, so independent agents (e.g. summarizer and PYQ
+        analysis after a multi-document upload) no longer serialize.
         """
         last_msg = state["messages"][-1]
 
         if isinstance(last_msg, AIMessage):
             content = (last_msg.content or "").strip()
-            try:
-                decision = json.loads(content)
-                next_agent = decision.get("next_agent", "").strip()
-                reason = decision.get("reason", "No reason provided.")
-                print(f"[Supervisor Decision] → {next_agent} | Reason: {reason}")
-                return next_agent.lower() if next_agent else "end"
-            except json.JSONDecodeError:
-                print("[Error] Supervisor response not valid JSON. Ending workflow.")
+            targets, reason = _parse_decision(content)
+            if targets is None:
+                logger.warning("Supervisor response not valid routing JSON. Ending workflow.")
+                return "end"
+
+            targets = [t for t in targets if t in self._valid]
+            logger.debug("[Supervisor Decision] -> %s | Reason: %s", targets or ['end'], reason)
+            if not targets:
                 return "end"
+            return targets if len(targets) > 1 else targets[0]
 
-        print("[Supervisor → END] No valid decision found.")
+        logger.debug("[Supervisor -> END] No valid decision found.")
         return "end"
 
     def compile(self):
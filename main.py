@@ -1,24 +1,27 @@
 # main.py
+import asyncio
+import logging
 import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, AIMessage
-from graph.multi_agent_graph import MultiAgentGraph
-from agents.supervisor_agent import SupervisorAgent
-from agents.document_processor_agent import DocumentProcessorAgent
-from agents.summarizer_agent import SummarizerAgent
-from agents.pyq_syllabus_analyser_agent import PYQSyllabusAnalyserAgent
+from langchain_core.messages import HumanMessage
+from bootstrap import build_agents
 from agents.youtube_summarizer_agent import YouTubeSummarizerAgent
-from agents.StoreAnalysisAgent import StoreAnalysisAgent
-from agents.qa_agent import QAAgent
+from agents.qa_agent import QAAgent, invalidate_retriever_cache
 from utils.message_utils import pretty_print_messages  # optional helper to print nicely
-from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi import FastAPI, UploadFile, File, Form, Request, BackgroundTasks, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import shutil
+import aiofiles
 
 load_dotenv()
 
+# Quiet by default; raise to DEBUG to see routing/storage traces.
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Legal Document Assistant")
 app.add_middleware(
     CORSMiddleware,
@@ -28,76 +31,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-session_state = {
-    "file_path": None,
-    "youtube_url": None,
-    "chat_history": []
-}
+@dataclass
+class SessionState:
+    # Each session gets its own QAAgent so chat history never leaks across
+    # users; construction is cheap because the LLM, tool and vector-store
+    # handles come from the process-wide cached factories.
+    qa_agent: QAAgent = None
+    file_path: Optional[str] = None
+    youtube_url: Optional[str] = None
+    # Per-session lock: concurrent requests from different users never
+    # contend with each other, only with themselves.
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+sessions: Dict[str, SessionState] = {}
+
+
+def get_session(session_id: str) -> SessionState:
+    session = sessions.get(session_id)
+    if session is None:
+        session = sessions.setdefault(
+            session_id,
+            SessionState(qa_agent=QAAgent(persist_directory=VECTOR_DB_DIR))
+        )
+    return session
 
 UPLOAD_FILE_PATH = r"uploads\CN_pyq.pdf"
 VECTOR_DB_DIR = "vector_store"
 
-doc_ingestion_agent = DocumentProcessorAgent(persist_directory=VECTOR_DB_DIR).create_agent()
-summarizer_agent = SummarizerAgent(persist_directory=VECTOR_DB_DIR).create_agent()
-pyq_analysis_agent = PYQSyllabusAnalyserAgent(persist_directory=VECTOR_DB_DIR).create_agent()
-youtube_agent = YouTubeSummarizerAgent(persist_directory=VECTOR_DB_DIR).create_agent()
-supervisor_agent = SupervisorAgent().create_agent()
-analysis_storage_agent = StoreAnalysisAgent(persist_directory=VECTOR_DB_DIR).create_agent()
-
-agents = {
-    "supervisor_agent": supervisor_agent,
-    "document_ingestion_agent": doc_ingestion_agent,
-    "summarizer_agent": summarizer_agent,
-    "pyq_syllabus_analysis_agent": pyq_analysis_agent,
-    "youtube_video_summarizer_agent": youtube_agent,
-    "store_analysis_agent": analysis_storage_agent,
-}
-
-agent_graph = MultiAgentGraph(agents)
-agent_graph.build_graph()
-compiled_graph = agent_graph.compile()
-
-qa_agent = QAAgent(persist_directory=VECTOR_DB_DIR)
-
-def run_graph(file_path: str):
-    print(f"[INFO] Starting workflow via graph for: {file_path}")
+agents, compiled_graph = build_agents(VECTOR_DB_DIR)
+
+async def stream_graph(file_path: str):
+    """Yields agent outputs as the graph produces them — nothing is buffered."""
+    logger.info("Starting workflow via graph for: %s", file_path)
     input_state = {
         "messages": [HumanMessage(content=f"New file uploaded: {file_path}")]
     }
 
-    agent_response_fragments = []
     try:
-        for chunk in compiled_graph.stream(input_state):
+        # astream keeps the event loop free while graph nodes await their
+        # LLM calls, so concurrent /chat requests keep being served.
+        async for chunk in compiled_graph.astream(input_state):
             pretty_print_messages(chunk, last_message=True)
             if "messages" in chunk and chunk["messages"]:
                 for m in chunk["messages"]:
                     if m.content:
-                        agent_response_fragments.append(m.content)
+                        yield m.content
     except Exception as e:
-        print(f"[ERROR] Graph execution failed: {e}")
+        logger.error("Graph execution failed: %s", e)
+
 
-    final_message = "\n".join(agent_response_fragments).strip()
-    if final_message:
-        print(f"\n[INFO] Workflow completed. Final supervisor output:\n{final_message}\n")
+async def run_graph(file_path: str):
+    # Log each fragment as it arrives instead of joining every LLM output
+    # into one giant string at the end; peak memory stays at one fragment.
+    produced = False
+    async for fragment in stream_graph(file_path):
+        produced = True
+        logger.debug("Agent output:\n%s", fragment)
+    if produced:
+        logger.info("Workflow completed for: %s", file_path)
 
 
 class ChatRequest(BaseModel):
     message: str
 
+async def _process_upload(file_location: str):
+    await run_graph(file_location)
+    invalidate_retriever_cache()  # new content makes memoized retrievals stale
+
+
 @app.post("/upload")
 async def upload_file_or_url(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
-    youtube_url: str = Form(None)
+    youtube_url: str = Form(None),
+    x_session_id: str = Header("default", alias="x-session-id")
 ):
+    session = get_session(x_session_id)
     if file:
         file_location = f"uploads/{file.filename}"
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        session_state["file_path"] = file_location
-        run_graph(file_location)
-        return {"status": "success", "message": f"File '{file.filename}' uploaded and processed."}
+        # Stream to disk without blocking the event loop, then hand the
+        # multi-minute ingestion pipeline to a background task so /chat and
+        # /health stay responsive while it runs.
+        async with aiofiles.open(file_location, "wb") as buffer:
+            while chunk := await file.read(1 << 20):
+                await buffer.write(chunk)
+        session.file_path = file_location
+        background_tasks.add_task(_process_upload, file_location)
+        return JSONResponse(
+            status_code=202,
+            content={"status": "accepted", "message": f"File '{file.filename}' uploaded; processing started."}
+        )
     elif youtube_url:
-        session_state["youtube_url"] = youtube_url
+        session.youtube_url = youtube_url
         try:
             yt_agent = YouTubeSummarizerAgent(persist_directory=VECTOR_DB_DIR)
             result = yt_agent.summarize(youtube_url)
@@ -109,19 +135,18 @@ async def upload_file_or_url(
         return JSONResponse(status_code=400, content={"status": "error", "message": "No file or YouTube URL provided."})
 
 @app.post("/chat")
-async def chat_with_bot(request: ChatRequest):
+async def chat_with_bot(
+    request: ChatRequest,
+    x_session_id: str = Header("default", alias="x-session-id")
+):
     question = request.message.strip()
     if not question:
         return JSONResponse(status_code=400, content={"status": "error", "message": "Empty message."})
-    session_state["chat_history"].append(("user", question))
-    messages = []
-    for role, msg in session_state["chat_history"]:
-        if role == "user":
-            messages.append(HumanMessage(content=msg))
-        elif role == "agent":
-            messages.append(AIMessage(content=msg))
-    answer = qa_agent.answer(question)
-    session_state["chat_history"].append(("agent", answer))
+    session = get_session(x_session_id)
+    async with session.lock:
+        # The agent tracks its own bounded history; it lands in the LLM
+        # prompt via aanswer, so no second copy is kept here.
+        answer = await session.qa_agent.aanswer(question)
     return {"status": "success", "answer": answer}
 
 @app.get("/health")
@@ -1,14 +1,81 @@
 # tools/analysis_storage_tool.py
 from __future__ import annotations
+import inspect
+import logging
+import os
+import uuid
+from functools import lru_cache
+
+import numpy as np
+
+# orjson serializes straight to UTF-8 bytes in native code; fall back to the
+# stdlib when it isn't installed.
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json as _json
+
+    def _json_dumps(obj) -> str:
+        return _json.dumps(obj, ensure_ascii=False)
 from typing import Optional, Dict, Any, List, Union
-from datetime import datetime
+import time
 from pydantic import BaseModel, Field
 
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document as LCDocument
 from langchain_core.tools import StructuredTool
 
+# Dimension of text-embedding-3-small vectors; needed to build an empty FAISS index.
+_EMBEDDING_DIM = 1536
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide singletons: every tool instance that targets the same model /
+# persist directory shares one OpenAI client and one Chroma handle (and thus
+# one SQLite connection) instead of opening its own at import time.
+@lru_cache(maxsize=None)
+def get_embeddings(model: str = "text-embedding-3-small") -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=model)
+
+
+@lru_cache(maxsize=None)
+def get_vectorstore(persist_directory: str) -> Chroma:
+    return Chroma(
+        persist_directory=persist_directory,
+        embedding_function=get_embeddings()
+    )
+
+# Inner-product search needs unit-norm vectors; normalize in JITed loops when
+# numba is available, otherwise fall back to vectorized numpy.
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _norm2d(m):
+        for i in prange(m.shape[0]):
+            s = 0.0
+            for j in range(m.shape[1]):
+                s += m[i, j] * m[i, j]
+            inv = 1.0 / (s ** 0.5 + 1e-12)
+            for j in range(m.shape[1]):
+                m[i, j] *= inv
+        return m
+
+    # Warm up the JIT at import so the first real store doesn't pay compile cost.
+    _norm2d(np.ones((1, 4), dtype=np.float32))
+except ImportError:
+    def _norm2d(m):
+        m /= (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
+        return m
+
+
+def _normalize_rows(vectors) -> "np.ndarray":
+    return _norm2d(np.asarray(vectors, dtype=np.float32))
+
 
 class _StoreArgs(BaseModel):
     agent_name: str = Field(..., description="Name of the agent storing the result, e.g., 'summarizer_agent'.")
@@ -18,6 +85,16 @@ class _StoreArgs(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(None, description="Optional extra metadata to index with the record.")
 
 
+class _StoreBatchArgs(BaseModel):
+    records: List[Dict[str, Any]] = Field(
+        ...,
+        description=(
+            "List of analysis records to store in one shot. Each record has the same keys as "
+            "store_analysis_result: agent_name, result_type, result, and optional doc_id/metadata."
+        )
+    )
+
+
 class _RetrieveArgs(BaseModel):
     query: str = Field(..., description="User query to retrieve relevant analyses.")
     k: int = Field(5, description="Number of top matches to return.")
@@ -34,13 +111,31 @@ class AnalysisStorageTool:
     - Retrieving relevant analyses for Q&A
     """
 
-    def __init__(self, persist_directory: str = "vector_store"):
+    def __init__(self, persist_directory: str = "vector_store", backend: Optional[str] = None):
         self.persist_directory = persist_directory
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        self.vs = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=self.embeddings
-        )
+        self.embeddings = get_embeddings()
+
+        # Chroma stays the default for durability; FAISS (IndexFlatIP over
+        # normalized vectors) can be opted into for the hot query path via
+        # ANALYSIS_VECTOR_BACKEND=faiss.
+        self.backend = (backend or os.getenv("ANALYSIS_VECTOR_BACKEND", "chroma")).lower()
+        if self.backend == "faiss":
+            try:
+                self.vs = self._init_faiss()
+            except ImportError:
+                logger.warning("faiss not installed; falling back to Chroma backend.")
+                self.backend = "chroma"
+        elif self.backend != "chroma":
+            # Unknown value (e.g. a typo in the env var) degrades the same
+            # way the missing-faiss case does instead of crashing later.
+            logger.warning("Unknown analysis vector backend %r; falling back to Chroma.", self.backend)
+            self.backend = "chroma"
+        if self.backend == "chroma":
+            self.vs = get_vectorstore(persist_directory)
+
+        # Probe metadata-filter support once instead of paying a TypeError
+        # round-trip on every filtered query.
+        self._supports_filter = "filter" in inspect.signature(self.vs.similarity_search).parameters
 
         self._store_tool = StructuredTool.from_function(
             name="store_analysis_result",
@@ -53,6 +148,18 @@ class AnalysisStorageTool:
             return_direct=False,
         )
 
+        self._store_batch_tool = StructuredTool.from_function(
+            name="store_analysis_results",
+            description=(
+                "Store SEVERAL analysis results in one call. Embeds all records in a single "
+                "batch request — prefer this over repeated store_analysis_result calls when "
+                "more than one result is being persisted in the same turn."
+            ),
+            func=self._store_batch_impl,
+            args_schema=_StoreBatchArgs,
+            return_direct=False,
+        )
+
         self._retrieve_tool = StructuredTool.from_function(
             name="retrieve_analysis",
             description=(
@@ -64,6 +171,32 @@ class AnalysisStorageTool:
             return_direct=False,
         )
 
+    def _init_faiss(self):
+        """Loads (or creates) a FAISS inner-product index for analysis retrieval."""
+        import faiss
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+
+        faiss_path = os.path.join(self.persist_directory, "analysis_faiss")
+        if os.path.exists(faiss_path):
+            return FAISS.load_local(
+                faiss_path,
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.IndexFlatIP(_EMBEDDING_DIM),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            normalize_L2=True,
+        )
+
+    def _persist(self) -> None:
+        """Flushes the backing store to disk; Chroma >=0.4 auto-persists on write."""
+        if self.backend == "faiss":
+            self.vs.save_local(os.path.join(self.persist_directory, "analysis_faiss"))
+
     def _store_impl(
         self,
         agent_name: str,
@@ -72,11 +205,10 @@ class AnalysisStorageTool:
         doc_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
-        timestamp = datetime.utcnow().isoformat() + "Z"
+        timestamp = time.time_ns()  # integer ns: cheap to produce, cheap to range-filter
 
         if isinstance(result, (dict, list)):
-            import json
-            text_repr = json.dumps(result, ensure_ascii=False)
+            text_repr = _json_dumps(result)
         else:
             text_repr = str(result)
 
@@ -89,41 +221,82 @@ class AnalysisStorageTool:
         if metadata:
             meta.update(metadata)
 
-        self.vs.add_documents([LCDocument(page_content=text_repr, metadata=meta)])
-        self.vs.persist()
+        # Written through immediately: agents each hold their own tool
+        # instance, so anything buffered here would be invisible to the
+        # retrieval side until process exit.
+        self._add_texts_batch([text_repr], [meta])
+
+        logger.debug("Stored analysis result: type=%r, agent=%r, doc_id=%r", result_type, agent_name, doc_id)
+
+    def _store_batch_impl(self, records: List[Dict[str, Any]]) -> str:
+        timestamp = time.time_ns()  # integer ns: cheap to produce, cheap to range-filter
+
+        texts: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        for record in records:
+            result = record.get("result")
+            if isinstance(result, (dict, list)):
+                texts.append(_json_dumps(result))
+            else:
+                texts.append(str(result))
 
-        print(f"Stored analysis result: type='{result_type}', agent='{agent_name}', doc_id='{doc_id}'")
+            meta = {
+                "agent_name": record.get("agent_name", "unknown"),
+                "type": record.get("result_type", "unknown"),
+                "doc_id": record.get("doc_id"),
+                "timestamp": timestamp,
+            }
+            if record.get("metadata"):
+                meta.update(record["metadata"])
+            metas.append(meta)
+
+        self._add_texts_batch(texts, metas)
+
+        logger.debug("Stored %d analysis results in one batch.", len(records))
+        return f"Stored {len(records)} analysis results."
+
+    def _add_texts_batch(self, texts: List[str], metas: List[Dict[str, Any]]) -> None:
+        """One embedding round-trip for the whole batch, then one add."""
+        embeddings = self.embeddings.embed_documents(texts)
+        if self.backend == "faiss":
+            self.vs.add_embeddings(
+                text_embeddings=list(zip(texts, _normalize_rows(embeddings))),
+                metadatas=metas
+            )
+        else:
+            self.vs._collection.add(
+                ids=[str(uuid.uuid4()) for _ in texts],
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=metas,
+            )
+        self._persist()
 
     def _retrieve_impl(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        try:
-            results = self.vs.similarity_search(query, k=k, filter=filter)  # type: ignore[arg-type]
-        except TypeError:
+        if filter and not self._supports_filter:
+            # Over-fetch and post-filter in Python; the capability was probed
+            # once at init, so no per-call exception dance is needed.
+            candidates = self.vs.similarity_search(query, k=k * 4)
+            results = [
+                r for r in candidates
+                if all((r.metadata or {}).get(kf) == vf for kf, vf in filter.items())
+            ][:k]
+        elif filter:
+            results = self.vs.similarity_search(query, k=k, filter=filter)
+        else:
             results = self.vs.similarity_search(query, k=k)
 
-            if filter:
-                def match(meta, filt):
-                    for kf, vf in filt.items():
-                        if meta.get(kf) != vf:
-                            return False
-                    return True
-                results = [r for r in results if match(r.metadata or {}, filter)]
-
-        payload = []
-        for i, r in enumerate(results, start=1):
-            payload.append({
-                "rank": i,
-                "content": r.page_content,
-                "metadata": r.metadata
-            })
         return {
             "query": query,
-            "results": payload
+            "results": [
+                {"rank": i, "content": r.page_content, "metadata": r.metadata}
+                for i, r in enumerate(results, 1)
+            ]
         }
-        
 
     def get_tools(self):
         """Tools for agents that need to STORE results."""
-        return [self._store_tool]
+        return [self._store_tool, self._store_batch_tool]
 
     def get_retrieval_tools(self):
         """Tools for agents that need to RETRIEVE results (Q&A)."""
@@ -1,9 +1,19 @@
 # tools/youtube_transcript_tool.py
+import asyncio
 import os
+import re
+import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
 from youtube_transcript_api import YouTubeTranscriptApi
-from urllib.parse import urlparse, parse_qs
+
+# One compiled pattern covers watch?v=, youtu.be/, /embed/ and /shorts/ URLs;
+# the old urlparse + parse_qs pair only understood the first form.
+_YT_ID = re.compile(r"(?:v=|youtu\.be/|/embed/|/shorts/)([A-Za-z0-9_-]{11})")
+
+# At most this many transcript fetches in flight for get_many.
+_FETCH_CONCURRENCY = 8
+
 
 class YouTubeTranscriptTool:
     def __init__(self):
@@ -11,6 +21,38 @@ class YouTubeTranscriptTool:
         self.description = "Fetches transcript text for a given YouTube video URL."
         load_dotenv()
         self.api_key = os.getenv("YOUTUBE_API_KEY")
+        # Shared session: repeated fetches reuse one TCP/TLS connection
+        # instead of paying DNS + handshake per call.
+        self._session = requests.Session()
+
+    def _fetch_transcript(self, video_url: str) -> str:
+        """Resolves a URL to its transcript text; raises on bad URLs."""
+        m = _YT_ID.search(video_url)
+        if not m:
+            raise ValueError("Invalid YouTube URL. Could not extract video ID.")
+        if not self.api_key:
+            raise ValueError("YouTube API key not set. Please add YOUTUBE_API_KEY to your .env file.")
+        try:
+            # Newer youtube-transcript-api releases accept an http_client,
+            # which lets the shared session carry every request.
+            data = YouTubeTranscriptApi(http_client=self._session).fetch(m.group(1)).to_raw_data()
+        except TypeError:
+            data = YouTubeTranscriptApi.get_transcript(m.group(1))
+        return "".join(entry["text"] + " " for entry in data)
+
+    async def _afetch_many(self, video_urls):
+        """Fetches several transcripts concurrently with a bounded semaphore."""
+        semaphore = asyncio.Semaphore(_FETCH_CONCURRENCY)
+        loop = asyncio.get_running_loop()
+
+        async def fetch_one(url):
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(None, self._fetch_transcript, url)
+                except Exception as e:
+                    return f"Error fetching transcript: {e}"
+
+        return await asyncio.gather(*(fetch_one(u) for u in video_urls))
 
     @tool("get_youtube_transcript", return_direct=True)
     def get_youtube_transcript(self, video_url: str) -> str:
@@ -19,22 +61,19 @@ class YouTubeTranscriptTool:
         Returns the full transcript text.
         """
         try:
-            video_id = parse_qs(urlparse(video_url).query).get("v", [None])[0]
-            if not video_id:
-                raise ValueError("Invalid YouTube URL. Could not extract video ID.")
-            if not self.api_key:
-                raise ValueError("YouTube API key not set. Please add YOUTUBE_API_KEY to your .env file.")
-            # Example: Use the API key in a request (pseudo-code, replace with actual API call if needed)
-            # import requests
-            # response = requests.get(f"https://www.googleapis.com/youtube/v3/videos?id={video_id}&key={self.api_key}&part=snippet")
-            # if response.status_code != 200:
-            #     raise Exception(f"YouTube API error: {response.text}")
-            # transcript_data = # parse transcript from response
-            transcript_data = YouTubeTranscriptApi.get_transcript(video_id)
-            transcript_text = " ".join([entry["text"] for entry in transcript_data])
-            return transcript_text
+            return self._fetch_transcript(video_url)
         except Exception as e:
             return f"Error fetching transcript: {str(e)}"
 
+    @tool("get_youtube_transcripts", return_direct=True)
+    def get_youtube_transcripts(self, video_urls: list) -> dict:
+        """
+        Fetches transcripts for SEVERAL YouTube video URLs at once.
+        Transcripts are fetched concurrently, so N videos take roughly as
+        long as the slowest one. Returns a mapping of URL to transcript text.
+        """
+        texts = asyncio.run(self._afetch_many(video_urls))
+        return dict(zip(video_urls, texts))
+
     def get_tools(self):
-        return [self.get_youtube_transcript]
+        return [self.get_youtube_transcript, self.get_youtube_transcripts]
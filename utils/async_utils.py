@@ -0,0 +1,23 @@
+# utils/async_utils.py
+import asyncio
+import threading
+
+# One persistent loop, started lazily on a daemon thread, for synchronous
+# code that drives async clients. asyncio.run creates and then closes a
+# fresh loop per call, which strands any shared async HTTP client's
+# keep-alive connections on the dead loop and makes the next call fail
+# with "Event loop is closed".
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+
+def run_sync(coro):
+    """Runs a coroutine from synchronous code on the shared background loop."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_LOOP.run_forever, name="background-async-loop", daemon=True
+            ).start()
+    return asyncio.run_coroutine_threadsafe(coro, _LOOP).result()